@@ -1,6 +1,8 @@
 import argparse
 import csv
+import heapq
 import os
+import sys
 from typing import Dict, List, Tuple
 
 from openpyxl import load_workbook
@@ -8,20 +10,46 @@ from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib.units import cm
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.platypus import BaseDocTemplate, Frame, PageTemplate, Table, TableStyle, Paragraph, Spacer
 
 MODEL_SHEET_NAME = " Modele PAS TOUCHE"
 START_ROW_IDX_1BASED = 4  # Excel line 4
 END_ROW_IDX_1BASED = 100  # Excel line 100 (inclusive)
-COL_LASTNAME_LETTER = "C"  # Column C
-COL_FIRSTNAME_LETTER = "D"  # Column D
-COL_SCORE_LETTER = "I"  # Column I
-COL_POINTS_LETTER = "K"  # Column K
+COL_LASTNAME_IDX = 2  # Column C (0-based)
+COL_FIRSTNAME_IDX = 3  # Column D (0-based)
+COL_SCORE_IDX = 8  # Column I (0-based)
+COL_POINTS_IDX = 10  # Column K (0-based)
 TOP_K = 15
 
-
-def cell(ws, row: int, col_letter: str):
-    return ws[f"{col_letter}{row}"].value
+# (last, first) -> min-heap of the player's best (points, score) entries, at most k long
+PlayerData = Dict[Tuple[str, str], List[Tuple[float, float]]]
+
+# PDF styles are static: build them once at import instead of on every export
+_STYLES = getSampleStyleSheet()
+_TITLE_STYLE = _STYLES["Title"]
+# Points columns start at index 4 (0:Classement,1:Nom,2:Prénom,3:Participations)
+_POINTS_END = 4 + TOP_K - 1
+_TOT_START = 4 + TOP_K
+_TOT_END = 4 + TOP_K + 1
+# TableStyle is only read by Table.setStyle, so one instance is shared by every export
+_TABLE_STYLE = TableStyle([
+    ("SPAN", (4, 0), (_POINTS_END, 0)),  # Group "Points" across TOP_K columns
+    ("SPAN", (_TOT_START, 0), (_TOT_END, 0)),  # Group "Totaux" across Scores and Points columns
+    ("BACKGROUND", (0, 0), (-1, 1), colors.lightgrey),
+    ("TEXTCOLOR", (0, 0), (-1, 1), colors.black),
+    ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+    ("ALIGN", (1, 2), (2, -1), "LEFT"),  # left-align Nom & Prénom in body
+    ("FONTNAME", (0, 0), (-1, 1), "Helvetica-Bold"),
+    ("FONTSIZE", (0, 0), (-1, -1), 7),
+    ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+    ("ROWBACKGROUNDS", (0, 2), (-1, -1), [colors.whitesmoke, colors.lightcyan]),
+    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+])
+
+
+def _to_name(v) -> str:
+    """Stripped text of a name cell; most are already str, so skip the str() call for those."""
+    return v.strip() if type(v) is str else ("" if v is None else str(v).strip())
 
 
 def get_authorized_players(excel_path: str) -> set:
@@ -35,18 +63,16 @@ def get_authorized_players(excel_path: str) -> set:
         
         if MODEL_SHEET_NAME in wb.sheetnames:
             ws = wb[MODEL_SHEET_NAME]
-            max_row = ws.max_row or 0
             
-            # Parcourir les lignes de la feuille Modele
-            for r in range(START_ROW_IDX_1BASED, max_row + 1):
-                ln = cell(ws, r, COL_LASTNAME_LETTER)
-                fn = cell(ws, r, COL_FIRSTNAME_LETTER)
-                
-                if (ln is None or str(ln).strip() == "") and (fn is None or str(fn).strip() == ""):
-                    continue
-                    
-                last_name = str(ln).strip() if ln is not None else ""
-                first_name = str(fn).strip() if fn is not None else ""
+            # Parcourir les lignes de la feuille Modele (colonnes C et D)
+            for ln, fn in ws.iter_rows(
+                min_row=START_ROW_IDX_1BASED,
+                min_col=COL_LASTNAME_IDX + 1,
+                max_col=COL_FIRSTNAME_IDX + 1,
+                values_only=True,
+            ):
+                last_name = _to_name(ln)
+                first_name = _to_name(fn)
                 
                 if last_name or first_name:
                     authorized_players.add((last_name, first_name))
@@ -57,76 +83,115 @@ def get_authorized_players(excel_path: str) -> set:
         return set()
 
 
-def parse_excel_all_sheets(excel_path: str) -> Dict[Tuple[str, str], Tuple[List[float], List[float]]]:
-    """Parse all sheets with identical structure and aggregate scores and points by (last, first).
-
-    Only rows 4..100 (inclusive) are considered per sheet. Columns are positional:
-    - C: last name
-    - D: first name
-    - I: score
-    - K: points
-
-    Returns mapping player_key -> (list of scores, list of points) accumulated across sheets.
-    Players without any score are not included.
-    """
-    wb = load_workbook(excel_path, data_only=True)
-
-    player_to_data: Dict[Tuple[str, str], Tuple[List[float], List[float]]] = {}
-
-    for ws in wb.worksheets:
-        max_row = ws.max_row or 0
-        start = START_ROW_IDX_1BASED
-        end = min(END_ROW_IDX_1BASED, max_row)
-        if start > end:
-            continue
-
-        for r in range(start, end + 1):
-            ln = cell(ws, r, COL_LASTNAME_LETTER)
-            fn = cell(ws, r, COL_FIRSTNAME_LETTER)
-            sc = cell(ws, r, COL_SCORE_LETTER)
-            pt = cell(ws, r, COL_POINTS_LETTER)
-
-            if (ln is None or str(ln).strip() == "") and (fn is None or str(fn).strip() == ""):
-                continue
+def _parse_worksheet(ws, k: int, player_to_data: PlayerData, name_keys: Dict[Tuple, Tuple[str, str]]) -> None:
+    """Fold one sheet's rows into player_to_data (see parse_excel_all_sheets)."""
+    # Rows are streamed from column C to K; positions of D, I, K within each row tuple
+    min_col = COL_LASTNAME_IDX + 1
+    max_col = COL_POINTS_IDX + 1
+    i_fn = COL_FIRSTNAME_IDX - COL_LASTNAME_IDX
+    i_sc = COL_SCORE_IDX - COL_LASTNAME_IDX
+    i_pt = COL_POINTS_IDX - COL_LASTNAME_IDX
+
+    # Two consecutive fully blank rows mark the end of the player list
+    blank_streak = 0
+
+    # Single streaming pass over columns C..K
+    for row in ws.iter_rows(
+        min_row=START_ROW_IDX_1BASED,
+        max_row=END_ROW_IDX_1BASED,
+        min_col=min_col,
+        max_col=max_col,
+        values_only=True,
+    ):
+        ln, fn, sc, pt = row[0], row[i_fn], row[i_sc], row[i_pt]
+        raw_names = (ln, fn)
+        key = name_keys.get(raw_names)
+        if key is None:
+            key = (sys.intern(_to_name(ln)), sys.intern(_to_name(fn)))
+            # Only cache text/empty cells: numeric cells such as 1 and 1.0 compare equal
+            # but format differently
+            if (ln is None or isinstance(ln, str)) and (fn is None or isinstance(fn, str)):
+                name_keys[raw_names] = key
+        if not key[0] and not key[1]:
             if sc is None:
-                continue
+                blank_streak += 1
+                if blank_streak >= 2:
+                    break
+            else:
+                # Rows with a score but no name are skipped but still break a blank streak
+                blank_streak = 0
+            continue
+        blank_streak = 0
+        if sc is None:
+            continue
 
+        if isinstance(sc, (int, float)):
+            numeric_score = float(sc)
+        else:
             try:
                 numeric_score = float(sc)
             except Exception:
                 continue
 
-            # Points can be None/missing, treat as 0
+        # Points can be None/missing, treat as 0
+        if isinstance(pt, (int, float)):
+            numeric_points = float(pt)
+        elif pt is None:
+            numeric_points = 0.0
+        else:
             try:
-                numeric_points = float(pt) if pt is not None else 0.0
+                numeric_points = float(pt)
             except Exception:
                 numeric_points = 0.0
 
-            last_name = str(ln).strip() if ln is not None else ""
-            first_name = str(fn).strip() if fn is not None else ""
-            if not last_name and not first_name:
-                continue
+        entry = (numeric_points, numeric_score)
+        heap = player_to_data.get(key)
+        if heap is None:
+            player_to_data[key] = [entry]
+        elif len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+
+def parse_excel_all_sheets(excel_path: str, k: int = TOP_K) -> PlayerData:
+    """Parse all sheets with identical structure and aggregate scores and points by (last, first).
 
-            key = (last_name, first_name)
-            if key not in player_to_data:
-                player_to_data[key] = ([], [])
-            player_to_data[key][0].append(numeric_score)
-            player_to_data[key][1].append(numeric_points)
+    Only rows 4..100 (inclusive) are considered per sheet, and reading a sheet stops at
+    the first two consecutive blank rows. Columns are positional:
+    - C: last name
+    - D: first name
+    - I: score
+    - K: points
 
-    # Keep only players with at least one score
-    return {k: v for k, v in player_to_data.items() if v[0]}
+    Returns mapping player_key -> min-heap of that player's k best (points, score) entries
+    across sheets, kept online while parsing so memory stays O(players * k).
+    Players without any score are not included.
+    """
+    wb = load_workbook(excel_path, data_only=True, read_only=True)
 
+    player_to_data: PlayerData = {}
+    # Raw (C, D) cell values -> interned (last, first) key; the same players recur on every sheet
+    name_keys: Dict[Tuple, Tuple[str, str]] = {}
 
-def compute_top_k_and_totals(player_data: Dict[Tuple[str, str], Tuple[List[float], List[float]]], k: int):
-    # Collect with metadata for ranking
-    rows_with_meta: List[Tuple[List, int, float, float, str, str]] = []  # (base_row, play_count, total_score, total_points, ln, fn)
+    try:
+        for ws in wb.worksheets:
+            _parse_worksheet(ws, k, player_to_data, name_keys)
+    finally:
+        # Read-only workbooks keep the zip file open until closed
+        wb.close()
 
-    for (last_name, first_name), (scores, points) in player_data.items():
-        # Sort by points desc to get top k points and corresponding scores
-        combined = list(zip(points, scores))
-        combined.sort(key=lambda x: (-x[0], -x[1]))  # points desc, then score desc
-        
-        top_combined = combined[:k]
+    # Only scored rows are recorded, so every player has at least one score
+    return player_to_data
+
+
+def compute_top_k_and_totals(player_data: PlayerData, k: int):
+    # Collect decorated with their ranking key so a plain (key-less) sort orders them
+    rows_with_meta: List[Tuple[float, float, str, str, List]] = []  # (-total_points, -total_score, ln, fn, base_row)
+
+    for (last_name, first_name), heap in player_data.items():
+        # The heap holds at most k entries, the best ones: points desc, then score desc (tuple order)
+        top_combined = sorted(heap, reverse=True)
         top_points = [p for p, s in top_combined]
         top_scores = [s for p, s in top_combined]
         
@@ -139,21 +204,22 @@ def compute_top_k_and_totals(player_data: Dict[Tuple[str, str], Tuple[List[float
         while len(base_row) < 3 + k:
             base_row.append("")
         base_row.extend([total_score, total_points])
-        rows_with_meta.append((base_row, play_count, total_score, total_points, last_name, first_name))
+        rows_with_meta.append((-total_points, -total_score, last_name, first_name, base_row))
 
     # Headers in final desired order
     points_cols = [str(i + 1) for i in range(k)]
     headers = ["Classement", "Nom", "Prénom", "Participations"] + points_cols + ["Totaux"] + ["Scores", "Points"]
 
-    # Sort for ranking: by total_points desc, then total_score desc, then name for stability
-    rows_with_meta.sort(key=lambda t: (-t[3], -t[2], t[4], t[5]))
+    # Sort for ranking: by total_points desc, then total_score desc, then name for stability.
+    # (ln, fn) is unique per player, so the comparison never reaches base_row.
+    rows_with_meta.sort()
 
     # Assign ranks with ties on (total_points, total_score)
     classement = 0
     last_key = None
     ranked_rows: List[List] = []
-    for i, (base_row, play_count, total_score, total_points, ln, fn) in enumerate(rows_with_meta):
-        key = (total_points, total_score)
+    for i, (neg_points, neg_score, _, _, base_row) in enumerate(rows_with_meta):
+        key = (neg_points, neg_score)
         if last_key is None or key != last_key:
             classement = i + 1
             last_key = key
@@ -161,8 +227,8 @@ def compute_top_k_and_totals(player_data: Dict[Tuple[str, str], Tuple[List[float
         final_row = [classement] + base_row
         ranked_rows.append(final_row)
 
-    # Final sort by rank asc, then name
-    ranked_rows.sort(key=lambda r: (r[0], r[1], r[2]))
+    # Ranks are assigned in sorted order and ties are already ordered by name,
+    # so ranked_rows is sorted by (rank, ln, fn) as is.
 
     return headers, ranked_rows
 
@@ -170,14 +236,29 @@ def compute_top_k_and_totals(player_data: Dict[Tuple[str, str], Tuple[List[float
 def export_csv(headers: List[str], rows: List[List], out_dir: str, filename: str = "classement_tarot.csv") -> str:
     os.makedirs(out_dir, exist_ok=True)
     out_path = os.path.join(out_dir, filename)
+    # Pad short rows; full-length rows are kept as-is
+    header_len = len(headers)
+    padded_rows = [row + [""] * (header_len - len(row)) if len(row) < header_len else row for row in rows]
+
+    # Fast path: when no cell needs quoting, join everything and write it at once.
+    # The output matches csv.writer's defaults (',' delimiter, '\r\n' line ends, str()
+    # of each value, so floats keep full precision).
+    lines: List[str] = []
+    for row in [headers, *padded_rows]:
+        line = ",".join(map(str, row))
+        # A delimiter inside a cell shows up as an extra comma in the joined line
+        if '"' in line or "\r" in line or "\n" in line or line.count(",") != len(row) - 1:
+            lines = []
+            break
+        lines.append(line)
+
     with open(out_path, "w", newline="", encoding="utf-8-sig") as f:
-        writer = csv.writer(f)
-        writer.writerow(headers)
-        for row in rows:
-            padded = row[:]
-            while len(padded) < len(headers):
-                padded.append("")
-            writer.writerow(padded)
+        if lines:
+            f.write("\r\n".join(lines) + "\r\n")
+        else:
+            writer = csv.writer(f)
+            writer.writerow(headers)
+            writer.writerows(padded_rows)
     return out_path
 
 
@@ -228,17 +309,27 @@ def export_error_file(authorized_players: set, unauthorized_players: List[Tuple[
     return out_path
 
 
+_PLAIN_PDF_COLUMNS = frozenset(("Classement", "Nom", "Prénom", "Participations"))
+
+
+def _format_pdf_number(val) -> str:
+    """Integral values without decimals, others with one decimal; blanks pass through."""
+    if isinstance(val, (int, float)):
+        f = float(val)
+        return str(int(f)) if f.is_integer() else f"{f:.1f}"
+    return str(val)
+
+
 def export_pdf(headers: List[str], rows: List[List], out_dir: str, filename: str = "classement_tarot.pdf", day: str = "Mardi", month: str = "") -> str:
     os.makedirs(out_dir, exist_ok=True)
     out_path = os.path.join(out_dir, filename)
 
-    styles = getSampleStyleSheet()
     # Construire le titre avec ou sans mois
     if month:
         title_text = f"Challenge {day} {month}"
     else:
         title_text = f"Challenge {day}"
-    title = Paragraph(title_text, styles["Title"])
+    title = Paragraph(title_text, _TITLE_STYLE)
     spacer = Spacer(1, 0.3*cm)
 
     # Two header rows: group label over points columns only
@@ -249,19 +340,11 @@ def export_pdf(headers: List[str], rows: List[List], out_dir: str, filename: str
 
     data: List[List[str]] = [first_header, second_header]
 
-    for row in rows:
-        formatted = []
-        for val in row:
-            if isinstance(val, (int, float)):
-                if float(val).is_integer():
-                    formatted.append(str(int(val)))
-                else:
-                    formatted.append(f"{float(val):.1f}")
-            else:
-                formatted.append(str(val))
-        data.append(formatted)
+    # One formatter per column, chosen once from the headers instead of per cell
+    formatters = [str if h in _PLAIN_PDF_COLUMNS else _format_pdf_number for h in headers]
+    data.extend([fmt(val) for fmt, val in zip(formatters, row)] for row in rows)
 
-    doc = SimpleDocTemplate(
+    doc = BaseDocTemplate(
         out_path,
         pagesize=landscape(A4),
         leftMargin=0.7*cm,
@@ -271,6 +354,9 @@ def export_pdf(headers: List[str], rows: List[List], out_dir: str, filename: str
         title="Classement Tarot",
         author="Classement Tarot",
     )
+    # Single page template: one frame covering the page inside the margins
+    frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height, id="normal")
+    doc.addPageTemplates([PageTemplate(id="Classement", frames=[frame], pagesize=doc.pagesize)])
 
     # Column widths tuned to fit
     col_widths = []
@@ -287,21 +373,7 @@ def export_pdf(headers: List[str], rows: List[List], out_dir: str, filename: str
             col_widths.append(1.2 * cm)
 
     table = Table(data, colWidths=col_widths, repeatRows=2)
-    table.setStyle(
-        TableStyle([
-            ("SPAN", (4, 0), (4 + k - 1, 0)),  # Group "Points" across k columns
-            ("SPAN", (4 + k, 0), (4 + k + 1, 0)),  # Group "Totaux" across Scores and Points columns
-            ("BACKGROUND", (0, 0), (-1, 1), colors.lightgrey),
-            ("TEXTCOLOR", (0, 0), (-1, 1), colors.black),
-            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-            ("ALIGN", (1, 2), (2, -1), "LEFT"),  # left-align Nom & Prénom in body
-            ("FONTNAME", (0, 0), (-1, 1), "Helvetica-Bold"),
-            ("FONTSIZE", (0, 0), (-1, -1), 7),
-            ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
-            ("ROWBACKGROUNDS", (0, 2), (-1, -1), [colors.whitesmoke, colors.lightcyan]),
-            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-        ])
-    )
+    table.setStyle(_TABLE_STYLE)
 
     story = [title, spacer, table]
     doc.build(story)
@@ -309,7 +381,7 @@ def export_pdf(headers: List[str], rows: List[List], out_dir: str, filename: str
 
 
 def run(excel_path: str, out_dir: str, want_pdf: bool, want_csv: bool, day: str, month: str = "", error_detection: bool = False):
-    player_data = parse_excel_all_sheets(excel_path)
+    player_data = parse_excel_all_sheets(excel_path, TOP_K)
     headers, rows = compute_top_k_and_totals(player_data, TOP_K)
     
     outputs: Dict[str, str] = {}